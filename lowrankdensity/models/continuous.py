@@ -23,7 +23,8 @@ class Continuous(Discrete):
     Attributes :
     ---------
     density_function : function object
-    A density function for bivariate distributions with inputs x,y each a 1d array
+    A density function for bivariate distributions with inputs x,y each a 1d array,
+    returning the matrix of values of shape (len(x),len(y))
 
 
     Example :
@@ -59,24 +60,47 @@ class Continuous(Discrete):
 
     def continuous_1d(self, Z, L=1):
         n = Z.shape[0]
-        r = np.min(Z[:int(n / 2)])
-        R = np.max(Z[:int(n / 2)])
+        r, R = Z[:n // 2].min(), Z[:n // 2].max()
 
         if (R - r < n**(-1 / 3) * L**(-1 / 2)):
-            return lambda x: 1 / (R - r) if (x <= r and x >= R) else 0
+            # Uniform density on [r,R], or 0 when the first half is constant
+            w = 1 / (R - r) if R > r else 0.
+            return lambda x: np.where((x >= r) & (x <= R), w, 0.)
 
         else:
             h = math.floor((R - r) * n**(1 / 3) * L**(1 / 2))**(-1) * (R - r)
             E = np.arange(-math.floor(r / h), math.ceil((1 - r) / h - 1))
 
+            # Histogram of the second half, computed once
+            idx = np.maximum(((Z[n // 2 + 1:] - r) / h).astype(np.intp), 0)
+            N = np.bincount(idx[idx < len(E) + 1], minlength=len(E) + 1)
+
             def f(x):
-                N = np.zeros((len(E) + 1,))
-                for i in range(int(n / 2) + 1, n):
-                    N[int((Z[i] - r) / h)] += 1
-                return (1 / h) * N[int((x - r) / h)]
+                i = ((x - r) / h).astype(np.intp)
+                valid = (i >= 0) & (i < len(N))
+                return np.where(valid, (1 / h) * N[np.clip(i, 0, len(N) - 1)], 0.)
 
             return f
 
+    def _compute_grid_histograms(self, x1, x2):
+        # Histograms N1, N2 of the two quarters of the second half on the grid of grid_params,
+        # paired as in the original zip of the two ranges. Bins are int((x - r) / h), samples
+        # below the grid origin are counted in the first bin and samples above the grid dropped
+        r1, r2, h1, h2 = (self.grid_params[k] for k in ("r1", "r2", "h1", "h2"))
+        shape = (len(self.grid_params["E1"]) + 1, len(self.grid_params["E2"]) + 1)
+        n = len(x1)
+        a, b = n // 2 + 1, 3 * n // 4
+        c = b + 1
+        k = min(b - a, n - c)
+
+        def histogram(z1, z2):
+            i1 = np.maximum(((z1 - r1) / h1).astype(np.intp), 0)
+            i2 = np.maximum(((z2 - r2) / h2).astype(np.intp), 0)
+            keep = (i1 < shape[0]) & (i2 < shape[1])
+            return np.bincount(i1[keep] * shape[1] + i2[keep], minlength=shape[0] * shape[1]).reshape(shape)
+
+        return histogram(x1[a:a + k], x2[a:a + k]), histogram(x1[c:c + k], x2[c:c + k])
+
     def fit(self, X):
         """
         Fit the Bivariate Continuous Density model on the data
@@ -109,49 +133,46 @@ class Continuous(Discrete):
 
         n = X.shape[0]
         L = self.L
-        r1, R1 = np.min(X[:int(n / 2), 0]), np.max(X[:int(n / 2), 0])
-        r2, R2 = np.min(X[:int(n / 2), 1]), np.max(X[:int(n / 2), 1])
-
-        if R1 - r1 < n**(-1 / 3) * L**(-1 / 2):
-            g = self.continuous_1d(Z=X[int(n / 2 + 1):, 1])
-            self.density_function = lambda x, y: (1 / (R1 - r1)) * g(y) if (r1 <= x < R1) else 0
+        half = n // 2
+        scale = n**(1 / 3) * L**(1 / 2)
+        x1, x2 = np.ascontiguousarray(X[:, 0]), np.ascontiguousarray(X[:, 1])
+        r1, R1 = x1[:half].min(), x1[:half].max()
+        r2, R2 = x2[:half].min(), x2[:half].max()
+
+        if R1 - r1 < 1 / scale:
+            g = self.continuous_1d(Z=x2[half + 1:])
+            w1 = 1 / (R1 - r1) if R1 > r1 else 0.
+            self.density_function = lambda x, y: w1 * np.outer((r1 <= x) & (x < R1), g(y))
             return self
 
-        if R2 - r2 < n**(-1 / 3) * L**(-1 / 2):
-            g = self.continuous_1d(Z=X[int(n / 2 + 1):, 0])
-            self.density_function = lambda x, y: (1 / (R2 - r2)) * g(x) if (r2 <= y < R2) else 0
+        if R2 - r2 < 1 / scale:
+            g = self.continuous_1d(Z=x1[half + 1:])
+            w2 = 1 / (R2 - r2) if R2 > r2 else 0.
+            self.density_function = lambda x, y: w2 * np.outer(g(x), (r2 <= y) & (y < R2))
             return self
 
-        h1 = math.floor((R1 - r1) * n**(1 / 3) * L**(1 / 2))**(-1) * (R1 - r1)
-        h2 = math.floor((R2 - r2) * n**(1 / 3) * L**(1 / 2))**(-1) * (R2 - r2)
+        m1, m2 = math.floor((R1 - r1) * scale), math.floor((R2 - r2) * scale)
+        h1, h2 = m1**(-1) * (R1 - r1), m2**(-1) * (R2 - r2)
 
         E1 = np.arange(-math.floor(r1 / h1), math.ceil((1 - r1) / h1 - 1))
         E2 = np.arange(-math.floor(r2 / h2), math.ceil((1 - r2) / h2 - 1))
 
-        N1 = np.zeros((len(E1) + 1, len(E2) + 1))
-        N2 = np.zeros((len(E1) + 1, len(E2) + 1))
-
-        for i, j in zip(range(int(n / 2) + 1, int(3 * n / 4)), range(int(3 * n / 4) + 1, n)):
-            x1, y1 = X[i, :]
-            x2, y2 = X[j, :]
-
-            N1[int((x1 - r1) / h1), int((y1 - r2) / h2)] = N1[int((x1 - r1) / h1), int((y1 - r2) / h2)] + 1
-            N2[int((x2 - r1) / h1), int((y2 - r2) / h2)] = N2[int((x2 - r1) / h1), int((y2 - r2) / h2)] + 1
-
-        P = super()._compute_matrix(n=int(n / 2), Y1=N1, Y2=N2, discrete=False)
-
         grid_dict = {"r1": r1, "r2": r2, "R1": R1, "R2": R2, "h1": h1, "h2": h2, "E1": E1, "E2": E2}
         self.grid_params = grid_dict
 
-        m1 = math.floor((R1 - r1) * n**(1 / 3) * L**(1 / 2))
-        m2 = math.floor((R2 - r2) * n**(1 / 3) * L**(1 / 2))
+        # Build 2 histograms on the uniform grid with the two quarters of the second half
+        N1, N2 = self._compute_grid_histograms(x1, x2)
+        P = super()._compute_matrix(n=half, Y1=N1, Y2=N2, discrete=False)
 
         def f(x, y):
-            x1, y1 = int((x - r1) / h1), int((y - r2) / h2)
-            if 0 <= x1 < m1 and 0 <= y1 < m2:
-                return (1 / (h1 * h2)) * P[x1, y1]
-            else:
-                return (1 / (h1 * h2)) * (2 / n) * (N1[x1, y1] + N2[x1, y1])
+            # Grid cells of x and y, density is 0 outside of the grid
+            ix, iy = ((x - r1) / h1).astype(np.intp), ((y - r2) / h2).astype(np.intp)
+            inside = ((ix >= 0) & (ix < P.shape[0]))[:, None] & ((iy >= 0) & (iy < P.shape[1]))[None, :]
+            lowrank = ((ix >= 0) & (ix < m1))[:, None] & ((iy >= 0) & (iy < m2))[None, :]
+            ix, iy = np.clip(ix, 0, P.shape[0] - 1)[:, None], np.clip(iy, 0, P.shape[1] - 1)[None, :]
+
+            mat = np.where(lowrank, P[ix, iy], (2 / n) * (N1[ix, iy] + N2[ix, iy]))
+            return (1 / (h1 * h2)) * np.where(inside, mat, 0.)
 
         self.density_function = f
         return None
@@ -184,8 +205,7 @@ class Continuous(Discrete):
         if (np.all((x <= 1) & (x >= 0)) == False) or (np.all((y <= 1) & (y >= 0)) == False):
             warnings.warn("The low rank continuous estimator is sued for original densities with support on [0,1]x[0,1]")
 
-        lowrank_estimator = self.density_function
-        return np.array([[lowrank_estimator(i, j) for j in y] for i in x])
+        return self.density_function(x, y)
 
     def sample(self, n_samples=1000):
         """
@@ -204,25 +224,28 @@ class Continuous(Discrete):
         Samples drawn from discrete distribution with probability matrix P
 
         """
+        if not isinstance(n_samples, (int, np.integer)) or isinstance(n_samples, bool):
+            raise TypeError(f"n_samples should be an int value, not {type(n_samples)}")
+
+        if n_samples < 0:
+            raise ValueError("n_samples can only take positive values")
+
         r1, r2, R1, R2, h1, h2, E1, E2 = self.grid_params.values()
         f = self.density_function
 
         # 1. Define P
         range_a1, range_a2 = r1 + E1[:len(E1) - 1] * h1, r1 + E1[1:] * h1
         range_b1, range_b2 = r2 + E2[:len(E2) - 1] * h2, r2 + E2[1:] * h2
-        P2 = np.array([[(a2 - a1) * (b2 - b1) * f(a1, b1) for a1, a2 in zip(range_a1, range_a2)] for b1, b2 in zip(range_b1, range_b2)])
+        P2 = np.outer(range_a2 - range_a1, range_b2 - range_b1) * f(range_a1, range_b1)
         P2 = P2 / np.sum(P2)
 
-        # 2. Sample Z with a multinomial distribution with P
+        # 2. Sample the cells Z=(Z1,Z2) of the grid with probabilities P
         p = P2.flatten()
         nrow2, ncol2 = P2.shape
-        Z = np.random.multinomial(n=1, pvals=p, size=n_samples).reshape((n_samples, nrow2, ncol2))
-        Z = np.argwhere(Z == 1)[:, 1:]
+        Z1, Z2 = np.divmod(np.random.choice(nrow2 * ncol2, size=n_samples, p=p), ncol2)
 
         # 3. Use Z to sample continuous data with uniform distribution
-        Z1, Z2 = Z[:, 0], Z[:, 1]
-        rangeZ_a1, rangeZ_a2 = r1 + Z1 * h1, r1 + (Z1 + 1) * h1
-        rangeZ_b1, rangeZ_b2 = r2 + Z2 * h2, r2 + (Z2 + 1) * h2
-        X = np.array([np.random.uniform(low=[a1, b1], high=[a2, b2], size=2).T for a1, a2, b1, b2 in zip(rangeZ_a1, rangeZ_a2, rangeZ_b1, rangeZ_b2)])
+        low = np.column_stack([r1 + Z1 * h1, r2 + Z2 * h2])
+        X = np.random.uniform(low=low, high=low + [h1, h2])
 
         return X
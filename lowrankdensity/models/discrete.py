@@ -4,8 +4,27 @@ Low-rank probability matrix estimator for discrete distributions
 Authors : Laurène DAVID and Shreshtha SHAURYA
 """
 
+import functools
+import math
 import numpy as np
-from scipy.stats.contingency import crosstab
+from scipy.linalg.blas import get_blas_funcs
+from scipy.sparse.linalg import svds
+
+# Blocks with a smaller dimension are decomposed with a full LAPACK SVD, faster than ARPACK there
+_SVDS_MIN_DIM = 200
+
+
+@functools.lru_cache(maxsize=8)
+def _block_thresholds(d, n, alpha):
+    # Number T of dyadic buckets, mass below which a block is kept as is and singular value
+    # threshold of each (t,u) block, identical for repeated fits on data of the same shape
+    logd, log2 = math.log(d), math.log(2)
+    T = int(logd / log2)
+    thresh = 2 * alpha * logd / (n * log2)
+    mn = np.minimum.outer(np.arange(T + 1), np.arange(T + 1))
+    tau_tab = logd * np.sqrt(0.1 * 2.0**(1 - mn) / n)
+    tau_tab.flags.writeable = False
+    return T, thresh, tau_tab
 
 
 class Discrete:
@@ -46,32 +65,63 @@ class Discrete:
     def __init__(self, alpha=1):
         self.alpha = alpha
         self.probability_matrix = None
+        self._alias_q, self._alias_j = None, None
 
     def _compute_histograms(self, X):
-        # Create 2 matrices of same shape for final histograms
-        d1max, d2max = np.unique(X[:, 0]), np.unique(X[:, 1])
-        l1max, l2max = len(d1max), len(d2max)
-        Y1max, Y2max = np.zeros((l1max, l2max), dtype=int), np.zeros((l1max, l2max), dtype=int)
-        dictYmax = {k: dict(zip(d, np.arange(0, l))) for k, d, l in zip(["d1", "d2"], [d1max, d2max], [l1max, l2max])}
-
-        # Create 2 histograms by splitting data in half
-        c1, Y1 = crosstab(X[:int(len(X) / 2), 0], X[:int(len(X) / 2), 1])
-        c2, Y2 = crosstab(X[int(len(X) / 2):, 0], X[int(len(X) / 2):, 1])
-        dictY1 = {k: dict(zip(c1[i], np.arange(0, len(c1[i])))) for k, i in zip(["d1", "d2"], range(2))}
-        dictY2 = {k: dict(zip(c2[i], np.arange(0, len(c2[i])))) for k, i in zip(["d1", "d2"], range(2))}
+        # Contiguous copies of the two variables
+        x1, x2 = np.ascontiguousarray(X[:, 0]), np.ascontiguousarray(X[:, 1])
+        half = int(len(X) / 2)
 
-        # Fill 2 matrices Y1max, Y2max based on Y1, Y2
-        index1 = np.array(np.meshgrid(c1[0], c1[1])).T.reshape(-1, 2)
-        index2 = np.array(np.meshgrid(c2[0], c2[1])).T.reshape(-1, 2)
+        # Labels of the whole data, shared by the 2 histograms, and linear index of each pair of labels
+        d1max, inv1 = np.unique(x1, return_inverse=True)
+        d2max, inv2 = np.unique(x2, return_inverse=True)
+        shape = (len(d1max), len(d2max))
+        lin = inv1 * shape[1] + inv2
 
-        for (i1, j1), (i2, j2) in zip(index1, index2):
-            Y1max[dictYmax["d1"][i1], dictYmax["d2"][j1]] = Y1[dictY1["d1"][i1], dictY1["d2"][j1]]
-            Y2max[dictYmax["d1"][i2], dictYmax["d2"][j2]] = Y2[dictY2["d1"][i2], dictY2["d2"][j2]]
+        # Create 2 histograms by splitting data in half
+        Y1max = np.bincount(lin[:half], minlength=shape[0] * shape[1]).reshape(shape)
+        Y2max = np.bincount(lin[half:], minlength=shape[0] * shape[1]).reshape(shape)
 
         # Return the padded histograms Y1max and Y2max
         self.keys = tuple([d1max, d2max])
         return Y1max, Y2max
 
+    def _compute_buckets(self, p, T):
+        # Index t of the dyadic interval (2**(-t-1), 2**(-t)] containing each p, with all p <= 2**(-T) in bucket T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tp = np.floor(-np.log2(p))
+        tp[tp > T] = T
+
+        return [np.flatnonzero(tp == t) for t in range(T + 1)]
+
+    def _truncated_svd(self, M, tau):
+        # SVD of M restricted to its leading singular values, containing all singular values >= tau
+        if min(M.shape) < _SVDS_MIN_DIM:
+            return np.linalg.svd(M, full_matrices=False)
+
+        # Double the number of computed singular values until one falls below tau
+        k = 4
+        while k < min(M.shape) - 1:
+            U, s, Vh = svds(M, k=k, v0=np.ones(min(M.shape)))
+            order = np.argsort(s)[::-1]
+            if s[order[-1]] < tau:
+                return U[:, order], s[order], Vh[order, :]
+            k *= 2
+
+        return np.linalg.svd(M, full_matrices=False)
+
+    def _lowrank_block(self, M, tau):
+        # Projection of M on its singular values >= tau
+        if min(M.shape) == 1:
+            # A single row or column is its own rank 1 decomposition, with singular value its norm
+            return M if np.linalg.norm(M) >= tau else np.zeros_like(M)
+
+        U, s, Vh = self._truncated_svd(M, tau)
+        l = len(s[s >= tau])
+        Vh_scaled = s[:l, None] * Vh[:l, :]
+        gemm = get_blas_funcs("gemm", (U, Vh_scaled))
+        return gemm(1.0, U[:, :l], Vh_scaled)
+
     def _compute_matrix(self, X=None, n=None, Y1=None, Y2=None, discrete=True):
         # Compute histograms in the discrete case
         if discrete:
@@ -80,52 +130,37 @@ class Discrete:
 
         Y1 = Y1 / np.sum(Y1)
         Y2 = Y2 / np.sum(Y2)
-        d = np.max(np.shape(Y1))
+        d = max(Y1.shape)
 
-        if (n <= d * np.log(d)):
+        if (n <= d * math.log(d)):
             return (Y1 + Y2) / 2
 
+        # The blocks are estimated in float32, the statistical error O(1/sqrt(n)) dominating its rounding errors
         p, q = np.sum(Y1, axis=1), np.sum(Y1, axis=0)
-        res = np.zeros(np.shape(Y1))
-        T = int(np.log(d) / np.log(2))
+        Y2_32 = Y2.astype(np.float32)
+        res = np.zeros(Y1.shape, dtype=np.float32)
+        T, thresh, tau_tab = _block_thresholds(int(d), int(n), self.alpha)
+        I_list, J_list = self._compute_buckets(p, T), self._compute_buckets(q, T)
+
+        # Non-empty (t,u) blocks, disjoint in (I,J)
+        blocks = [(t, u) for t in range(T + 1) for u in range(T + 1) if len(I_list[t]) > 0 and len(J_list[u]) > 0]
+
+        for t, u in blocks:
+            I, J = I_list[t], J_list[u]
+            M = Y2_32[np.ix_(I, J)]
+
+            # Blocks without any sample leave res at 0
+            mass = M.sum()
+            if mass == 0:
+                continue
+
+            if (mass < thresh):
+                res[np.ix_(I, J)] = M
 
-        for t in range(T + 1):
-            if (t < T):
-                I = np.argwhere((p <= 2**(-t)) & (p > 2**(-t - 1)))
             else:
-                I = np.argwhere((p <= 2**(-t)))
-
-            if len(I) > 0:
-                for u in range(T + 1):
-                    if (u < T):
-                        J = np.argwhere((q <= 2**(-u)) & (q > 2**(-u - 1)))
-                    else:
-                        J = np.argwhere(q <= 2**(-u))
-
-                    if len(J) > 0:
-                        M = np.zeros((len(I), len(J)))
-                        row_id = np.zeros(Y2.shape[0], dtype=bool)
-                        row_id[I] = True
-                        col_id = np.zeros(Y2.shape[1], dtype=bool)
-                        col_id[J] = True
-
-                        M = Y2[row_id, :][:, col_id]
-
-                        if (np.sum(M) < 2 * self.alpha * np.log(d) / (n * np.log(2))):
-                            for i in range(len(I)):
-                                for j in range(len(J)):
-                                    res[I[i], J[j]] = Y2[I[i], J[j]]
-
-                        else:
-                            tau = np.log(d) * np.sqrt(0.1 * 2**(1 - min(t, u)) / n)
-                            U, s, Vh = np.linalg.svd(M)
-                            l = len(s[s >= tau])
-                            H = np.dot(U[:, :l] * s[:l], Vh[:l, :])
-
-                            for i in range(len(I)):
-                                for j in range(len(J)):
-                                    res[I[i], J[j]] = H[i, j]
+                res[np.ix_(I, J)] = self._lowrank_block(M, tau_tab[t, u])
 
+        res = res.astype(np.float64)
         res[res < 0.] = 0.
 
         if np.sum(res) == 0:
@@ -133,6 +168,22 @@ class Discrete:
 
         return res / np.sum(res)
 
+    def _compute_alias_table(self, p):
+        # Vose's alias method: cell i is drawn with probability q[i], else its alias j[i]
+        K = len(p)
+        q, j = p * K, np.arange(K)
+        small, large = list(np.flatnonzero(q < 1)), list(np.flatnonzero(q >= 1))
+
+        while small and large:
+            s, l = small.pop(), large.pop()
+            j[s] = l
+            q[l] = q[l] + q[s] - 1
+            (small if q[l] < 1 else large).append(l)
+
+        # Remaining cells only differ from 1 by rounding errors
+        q[small + large] = 1.
+        return q, j
+
     def fit(self, X):
         """
         Fit categorical dataset to discrete probability matrix estimator
@@ -167,6 +218,7 @@ class Discrete:
             raise ValueError(f"alpha should an int or float, not {type(self.alpha)}")
 
         self.probability_matrix = self._compute_matrix(X)
+        self._alias_q, self._alias_j = None, None
         return None
 
     def sample(self, n_samples=1000):
@@ -187,17 +239,25 @@ class Discrete:
 
         """
 
-        # Reshape probability_matrix
+        if not isinstance(n_samples, (int, np.integer)) or isinstance(n_samples, bool):
+            raise TypeError(f"n_samples should be an int value, not {type(n_samples)}")
+
+        if n_samples < 0:
+            raise ValueError("n_samples can only take positive values")
+
+        # Alias table of the flattened probability_matrix, computed once per fit
         P = self.probability_matrix
-        p = P.flatten()
+        if self._alias_q is None:
+            self._alias_q, self._alias_j = self._compute_alias_table(P.flatten())
+        q, j = self._alias_q, self._alias_j
 
-        # Sample 2D multinomial data with probability matrix
+        # Sample cells of the probability matrix and convert them to (row,col) indices
         nrow, ncol = P.shape
-        samples = np.random.multinomial(n=1, pvals=p, size=n_samples).reshape((n_samples, nrow, ncol))
-        samples = np.argwhere(samples == 1)[:, 1:]
+        i = np.random.randint(nrow * ncol, size=n_samples)
+        i = np.where(np.random.random_sample(n_samples) < q[i], i, j[i])
+        rows, cols = np.divmod(i, ncol)
 
         # Map values of samples to the labels of original data
-        dict_d1, dict_d2 = [dict(zip(np.arange(len(k)), k)) for k in self.keys]
-        samples_ = np.array([[dict_d1[i], dict_d2[j]] for i, j in samples])
+        samples_ = np.stack([self.keys[0][rows], self.keys[1][cols]], axis=1)
 
         return samples_
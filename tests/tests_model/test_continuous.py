@@ -1,4 +1,5 @@
 import pytest
+import warnings
 import numpy as np
 from lowrankdensity.models.continuous import Continuous
 from lowrankdensity.datasets._generate_samples import generate_lowrank_continuous
@@ -10,6 +11,57 @@ def test_continuous_1d_empty_parameter_error():  # typeerror case 1 empty parame
         model.continuous_1d()
 
 
+def test_continuous_1d_narrow_support():  # case 1 bis uniform density on [r,R] when the first half has a small range
+    Z = 0.5 + 1e-4 * np.random.default_rng(0).random(1000)
+    r, R = Z[:500].min(), Z[:500].max()
+    g = Continuous().continuous_1d(Z)
+    assert np.allclose(g(np.array([0.2, (r + R) / 2, 0.9])), [0, 1 / (R - r), 0])
+
+
+def test_continuous_1d_constant():  # case 1 ter constant first half gives a finite density
+    g = Continuous().continuous_1d(np.full(1000, 0.3))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        res = g(np.array([0.29, 0.3, 0.31]))
+    assert np.array_equal(res, np.zeros(3))
+
+
+@pytest.mark.parametrize(("col"), (0, 1))
+def test_pdf_constant_column(col):  # case 1 quater 1D branches of fit with a constant variable
+    X = np.random.default_rng(0).random((4000, 2))
+    X[:, col] = 0.5
+    model = Continuous(alpha=0.1)
+    model.fit(X)
+    x, y = np.array([0.2, 0.5, 0.505]), np.array([0.1, 0.3, 0.305, 0.9])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        res = model.pdf(x, y)
+    assert res.shape == (3, 4)
+    assert np.array_equal(res, np.zeros((3, 4)))
+
+
+def test_compute_grid_histograms_match_loop():  # case 1 quinquies N1, N2 against the original loop
+    n = 401  # the second range of the original zip is one sample longer than the first one
+    X = np.random.default_rng(0).random((n, 2))
+    r1, r2 = X[:n // 2, 0].min(), X[:n // 2, 1].min()
+    X[n // 2 + 1, 0] = r1 - 1e-3  # just below the grid origin, in the first bin
+    X[3 * n // 4 + 1, 1] = r2 - 1e-3
+    model = Continuous(alpha=0.1)
+    model.fit(X)
+    N1, N2 = model._compute_grid_histograms(X[:, 0], X[:, 1])
+
+    g = model.grid_params
+    N1_expected = np.zeros((len(g["E1"]) + 1, len(g["E2"]) + 1))
+    N2_expected = np.zeros((len(g["E1"]) + 1, len(g["E2"]) + 1))
+    for i, j in zip(range(int(n / 2) + 1, int(3 * n / 4)), range(int(3 * n / 4) + 1, n)):
+        N1_expected[int((X[i, 0] - g["r1"]) / g["h1"]), int((X[i, 1] - g["r2"]) / g["h2"])] += 1
+        N2_expected[int((X[j, 0] - g["r1"]) / g["h1"]), int((X[j, 1] - g["r2"]) / g["h2"])] += 1
+
+    assert np.array_equal(N1, N1_expected)
+    assert np.array_equal(N2, N2_expected)
+    assert N1.sum() == N2.sum() == 99
+
+
 def test_fit_valid_result():  # case 2 checking the result value is none fit function
     model = Continuous()
     X = generate_lowrank_continuous()
@@ -74,6 +126,56 @@ def test_pdf_dtype():  # case 7 dtype assert for pdf
     assert res.dtype == float or int
 
 
+def _fit_reference_density(X, model):
+    # Scalar density function of the original implementation, built on the fitted grid
+    n = X.shape[0]
+    g = model.grid_params
+    r1, r2, h1, h2 = g["r1"], g["r2"], g["h1"], g["h2"]
+    N1, N2 = model._compute_grid_histograms(X[:, 0], X[:, 1])
+    P = model._compute_matrix(n=n // 2, Y1=N1, Y2=N2, discrete=False)
+    m1 = int(np.floor((g["R1"] - r1) * n**(1 / 3)))
+    m2 = int(np.floor((g["R2"] - r2) * n**(1 / 3)))
+
+    def f(x, y):
+        x1, y1 = int((x - r1) / h1), int((y - r2) / h2)
+        if 0 <= x1 < m1 and 0 <= y1 < m2:
+            return (1 / (h1 * h2)) * P[x1, y1]
+        else:
+            return (1 / (h1 * h2)) * (2 / n) * (N1[x1, y1] + N2[x1, y1])
+
+    return f, N1.shape
+
+
+def test_pdf_match_reference():  # case 7 bis pdf against the scalar density function on the grid
+    np.random.seed(0)
+    X = generate_lowrank_continuous()
+    model = Continuous(alpha=0.1)
+    model.fit(X)
+    f, shape = _fit_reference_density(X, model)
+    g = model.grid_params
+    x = np.linspace(g["r1"], g["r1"] + shape[0] * g["h1"], 40, endpoint=False)
+    y = np.linspace(g["r2"], g["r2"] + shape[1] * g["h2"], 30, endpoint=False)
+    expected = np.array([[f(i, j) for j in y] for i in x])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # the grid may extend past 1
+        assert np.allclose(model.pdf(x, y), expected)
+
+
+def test_pdf_zero_outside_grid():  # case 7 ter density is 0 outside of the histogram grid
+    np.random.seed(0)
+    X = generate_lowrank_continuous()
+    model = Continuous(alpha=0.1)
+    model.fit(X)
+    g = model.grid_params
+    shape = (len(g["E1"]) + 1, len(g["E2"]) + 1)
+    x = np.array([g["r1"] - 2 * g["h1"], g["r1"] + (shape[0] + 1) * g["h1"]])
+    y = np.linspace(0, 1, 10)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        assert np.array_equal(model.pdf(x, y), np.zeros((2, 10)))
+        assert np.array_equal(model.pdf(y, x), np.zeros((10, 2)))
+
+
 @pytest.mark.parametrize(("x", "y"),  # case 8 bad shape error for pdf
                          (
     (np.ones((10, 2)), np.ones((10, 2))),
@@ -110,6 +212,24 @@ def test_sample_type():  # case 11 sample type
     assert samples.dtype == int or float
 
 
+def test_sample_orientation():  # case 11 ter samples keep the marginals of each variable
+    np.random.seed(0)
+    X = np.column_stack([np.random.beta(2, 8, 5000), np.random.beta(8, 2, 5000)])
+    model = Continuous(alpha=0.1)
+    model.fit(X)
+    samples = model.sample(5000)
+    assert samples[:, 0].mean() < 0.35
+    assert samples[:, 1].mean() > 0.65
+
+
+def test_sample_numpy_int():  # case 11 bis n_samples as a numpy integer
+    model = Continuous()
+    X = generate_lowrank_continuous()
+    model.fit(X)
+    samples = model.sample(np.int64(10))
+    assert samples.shape == (10, 2)
+
+
 @pytest.mark.parametrize(("sample"),  # case 12 bad sample
                          (
     (-4),
@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+from scipy.stats.contingency import crosstab
 from lowrankdensity.models.discrete import Discrete
 from lowrankdensity.datasets._generate_samples import generate_lowrank_discrete
 
@@ -35,6 +36,22 @@ def test_compute_histograms_type_Y2max():  # case 4 Y2 max type assertion
     assert Y2max.dtype == int
 
 
+@pytest.mark.parametrize(("X"),  # case 4 bis histograms against scipy crosstab
+                         (
+    (np.array([[1, 2], [1, 3], [2, 2], [2, 2], [3, 5], [1, 2]])),
+    (np.array([["a", "x"], ["b", "x"], ["a", "y"], ["c", "y"]])),
+))
+def test_compute_histograms_match_crosstab(X):
+    model = Discrete(alpha=0.1)
+    Y1max, Y2max = model._compute_histograms(X)
+    half = len(X) // 2
+    for Y, Z in zip((Y1max, Y2max), (X[:half], X[half:])):
+        (c0, c1), Y_expected = crosstab(Z[:, 0], Z[:, 1])
+        rows, cols = np.searchsorted(model.keys[0], c0), np.searchsorted(model.keys[1], c1)
+        assert np.array_equal(Y[np.ix_(rows, cols)], Y_expected)
+        assert Y.sum() == len(Z)
+
+
 def test_compute_histograms_empty_input_error():  # indexerror case 5 empty input error for _compute_histograms
     X = np.array([])
     model = Discrete(alpha=0.1)
@@ -48,6 +65,38 @@ def test_compute_histograms_empty_parameter_error():  # typeerror case 6 empty p
         Y1max, Y2max = model._compute_histograms()
 
 
+def test_compute_buckets_match_dyadic_intervals():  # case 6 bis buckets of p in dyadic intervals
+    p = np.array([1., 0.5, 0.3, 0.25, 0.2, 0.125, 0.1, 2**(-5), 0.01, 0.])
+    T = 4
+    model = Discrete(alpha=0.1)
+    buckets = model._compute_buckets(p, T)
+    for t in range(T):
+        assert np.array_equal(buckets[t], np.argwhere((p <= 2**(-t)) & (p > 2**(-t - 1))).ravel())
+    assert np.array_equal(buckets[T], np.argwhere(p <= 2**(-T)).ravel())
+
+
+@pytest.mark.parametrize(("shape"), ((30, 40), (300, 250)))  # case 6 ter truncated svd against full svd
+def test_truncated_svd_leading_singular_values(shape):
+    rng = np.random.default_rng(0)
+    M = rng.random((shape[0], 3)) @ rng.random((3, shape[1])) + 1e-3 * rng.random(shape)
+    tau = 0.5
+    model = Discrete(alpha=0.1)
+    U, s, Vh = model._truncated_svd(M, tau)
+    U_full, s_full, Vh_full = np.linalg.svd(M)
+    l = len(s_full[s_full >= tau])
+    assert np.allclose(s[:l + 1], s_full[:l + 1])
+    assert np.allclose((U[:, :l] * s[:l]) @ Vh[:l, :], (U_full[:, :l] * s_full[:l]) @ Vh_full[:l, :])
+
+
+@pytest.mark.parametrize(("shape", "tau"), (((1, 8), 0.1), ((8, 1), 0.1), ((1, 8), 10.)))  # case 6 quater skinny blocks
+def test_lowrank_block_single_row_or_column(shape, tau):
+    M = np.random.default_rng(0).random(shape)
+    model = Discrete(alpha=0.1)
+    U, s, Vh = np.linalg.svd(M)
+    l = len(s[s >= tau])
+    assert np.allclose(model._lowrank_block(M, tau), (U[:, :l] * s[:l]) @ Vh[:l, :])
+
+
 @pytest.mark.parametrize(("n", "Y1", "Y2", "expected_shape"),  # case 7 type + shape
                          (
     (100, np.ones((100, 2)), np.ones((100, 2)), (100, 2)),  # simple case
@@ -171,6 +220,18 @@ def test_fit_error_X(X):  # case 18 bad X values
         model.fit(X)
 
 
+@pytest.mark.parametrize(("p"),  # case 18 bis alias table gives back the probabilities
+                         (
+    (np.array([0., 0.5, 0., 0.25, 0.25])),
+    (np.random.default_rng(0).dirichlet(np.ones(100))),
+))
+def test_compute_alias_table_probabilities(p):
+    model = Discrete()
+    q, j = model._compute_alias_table(p)
+    K = len(p)
+    assert np.allclose((q + np.bincount(j, weights=1 - q, minlength=K)) / K, p)
+
+
 def test_sample_shape():  # case 19 asserting shape for sample
     model = Discrete()
     X = generate_lowrank_discrete()
@@ -189,6 +250,23 @@ def test_sample_type():  # case 20 asserting type
     assert samples.dtype == int or float
 
 
+def test_sample_numpy_int():  # case 20 ter n_samples as a numpy integer
+    model = Discrete()
+    X = generate_lowrank_discrete()
+    model.fit(X)
+    samples = model.sample(np.int64(10))
+    assert samples.shape == (10, 2)
+
+
+def test_sample_labels():  # case 20 bis samples are mapped to the labels of X
+    X = np.array([["a", "x"], ["b", "y"], ["a", "y"], ["c", "x"]] * 500)
+    model = Discrete(alpha=0.1)
+    model.fit(X)
+    samples = model.sample(1000)
+    assert set(samples[:, 0]) <= {"a", "b", "c"}
+    assert set(samples[:, 1]) <= {"x", "y"}
+
+
 @pytest.mark.parametrize(("sample"),  # case 21 bad sample values
                          (
     (-4),